@@ -0,0 +1,50 @@
+# cython: language_level=3, embedsignature=True, cdivision=True, boundscheck=False, wraparound=False
+
+"""
+    Compiled versions of the byte packers of :mod:`pypot.dynamixel.conversion`.
+
+    They are called for every register read/write so they are implemented with plain C integer arithmetic. If this extension is not built, :mod:`pypot.dynamixel.conversion` falls back to its pure python implementation.
+
+    """
+
+from cpython.bytes cimport PyBytes_FromStringAndSize
+from cpython.long cimport PyLong_AsUnsignedLongLongMask
+from cpython.number cimport PyNumber_Index
+
+
+cpdef object dxl_decode(data):
+    cdef bytes raw = bytes(data)
+    cdef const unsigned char *buf = raw
+    cdef Py_ssize_t length = len(raw), i
+    cdef unsigned long long output = 0
+
+    if length == 0:
+        raise ValueError('try to decode incorrect data {}'.format(data))
+
+    if length > 8:
+        return int.from_bytes(raw, 'little')
+
+    for i in range(length):
+        output |= (<unsigned long long> buf[i]) << (8 * i)
+    return output
+
+
+cpdef bytes dxl_code(value, int length):
+    cdef unsigned char buf[8]
+    cdef unsigned long long v
+    cdef int i
+
+    if length <= 0:
+        raise ValueError('try to code value with an incorrect length {}'.format(length))
+
+    # PyNumber_Index rejects non integer values (e.g. floats) instead of silently truncating them
+    value = PyNumber_Index(value)
+
+    if length > 8:
+        return (value & (((<object> 1) << (8 * length)) - 1)).to_bytes(length, 'little')
+
+    # values are truncated to length bytes (two's complement for negative values)
+    v = PyLong_AsUnsignedLongLongMask(value)
+    for i in range(length):
+        buf[i] = (v >> (8 * i)) & 0xFF
+    return PyBytes_FromStringAndSize(<char *> buf, length)
@@ -12,9 +12,10 @@
 
     """
 
+import math
 import numpy
-import itertools
-import time
+import operator
+from collections import namedtuple
 from enum import Enum
 import logging
 
@@ -32,6 +33,30 @@ position_range = {
     '*': (1024, 300.0)
 }
 
+_SPEED_FACTOR = {  # in rpm per tick
+    'MX': 0.114,
+    'SR': 0.114,
+    'EX': 0.111,
+    'XM': 0.229,
+    '*': 0.111
+}
+
+_TIME_FACTOR = {  # in ms per tick
+    'MX': 1,
+    'SR': 1,
+    'EX': 1,
+    'XM': 20,
+    '*': 1
+}
+
+_TORQUE_FACTOR = {  # in N.m per tick
+    'MX': 0.1,
+    'SR': 0.1,
+    'EX': 0.1,
+    'XM': 0.00269 * 1.66,
+    '*': 0.1
+}
+
 torque_max = {  # in N.m
     'MX-106': 8.4,
     'MX-64': 6.,
@@ -66,62 +91,36 @@ velocity = {  # in degree/s
 def dxl_to_degree(value, model):
     if value >= 0x80000000:
         value -= 0x100000000
-    determined_model = '*'
-    if model.startswith('MX'):
-        determined_model = 'MX'
-    elif model.startswith('SR'):
-        determined_model = 'SR'
-    elif model.startswith('EX'):
-        determined_model = 'EX'
-    elif model.startswith('XM'):
-        determined_model = 'XM'
-    max_pos, max_deg = position_range[determined_model]
-
-    return value * max_deg / max_pos
+    return value * _resolve(model).position_factor
 
 
 def degree_to_dxl(value, model):
-    determined_model = '*'
-    if model.startswith('MX'):
-        determined_model = 'MX'   
-    elif model.startswith('SR'):
-        determined_model = 'SR'
-    elif model.startswith('EX'):
-        determined_model = 'EX'
-    elif model.startswith('XM'):
-        determined_model = 'XM'
-    max_pos, max_deg = position_range[determined_model]
-
-    pos = int(round((float(value) * max_pos / max_deg), 0))
-    pos = min(max(pos, 0), max_pos - 1) # TODO: this is janky (what about extended position mode?)
+    params = _resolve(model)
+
+    pos = int(round((float(value) / params.position_factor), 0))
+    pos = min(max(pos, 0), params.max_pos - 1) # TODO: this is janky (what about extended position mode?)
 
     return pos
 
-def dxl_to_multi_degree(value,model):
-    # print('receiving this pos value = {}'.format(value))
 
+def dxl_to_multi_degree(value,model):
     if value >= 0x80000000:
         value -= 0x100000000
-    return 0.088*value
+    return value * 0.088
 
 def multi_degree_to_dxl(value,model):
-    determined_model = '*'
-    if model.startswith('MX'):
-        determined_model = 'MX'   
-    elif model.startswith('SR'):
-        determined_model = 'SR'
-    elif model.startswith('EX'):
-        determined_model = 'EX'
-    elif model.startswith('XM'):
-        determined_model = 'XM'
-    max_pos, max_deg = position_range[determined_model]
-    conv_factor = max_pos / max_deg
+    params = _resolve(model)
+    conv_factor = params.max_pos / params.max_deg
 
     if(value < 0):
         pos = 4294967296 + value * conv_factor
     else:
         pos = value * conv_factor
-    return int(numpy.round((numpy.clip(pos,0,4294967296))))
+    # the clamp below would silently turn NaN into 0
+    if not math.isfinite(pos):
+        raise ValueError('cannot convert non finite position {} to dxl'.format(value))
+    return int(round(max(0.0, min(pos, 4294967296.0))))
+
 
 # MARK: - Speed
 def dxl_to_speed(value, model):
@@ -130,26 +129,12 @@ def dxl_to_speed(value, model):
     # cw, speed = divmod(value, 1024)
     # direction = (-2 * cw + 1)
 
-    speed_factor = 0.111
-    if model.startswith('MX') or model.startswith('SR'):
-        speed_factor = 0.114
-    elif(model.startswith('XM')):
-        speed_factor = 0.229
-    # print('this is the value I got {}'.format(value))
-    if(value > 4294967296/2):
-        velocity = (value - 4294967296)
-    else:
-        velocity = value
-    return velocity*speed_factor
+    return value * _resolve(model).speed_factor
 
 
 def speed_to_dxl(value, model):
     # direction = 1024 if value < 0 else 0
-    speed_factor = 0.111
-    if model.startswith('MX') or model.startswith('SR'):
-        speed_factor = 0.114
-    elif(model.startswith('XM')):
-        speed_factor = 0.229
+    speed_factor = _resolve(model).speed_factor
 
     # max_value = 1023 * speed_factor * 6
     # value = min(max(value, -max_value), max_value)
@@ -157,18 +142,13 @@ def speed_to_dxl(value, model):
         speed = 4294967296 + value/speed_factor
     else:
         speed = value/speed_factor
-    # print('sending this speed:',speed)
-    return int(numpy.round(speed))
+    return int(round(speed))
 
 # MARK: - Torque
 
 
 def dxl_to_torque(value, model):
-
-    if(model.startswith('XM')):
-        return round(value*0.00269*1.66,1)
-    else:
-        return round(value / 10, 1)
+    return round(value * _resolve(model).torque_factor, 1)
 
 
 def torque_to_dxl(value, model):
@@ -176,23 +156,20 @@ def torque_to_dxl(value, model):
 
 
 def dxl_to_load(value, model):
-    # print('processing this value {}'.format(value))
     if value >= 0x8000:
         load = value - 0x10000
     else:
         load = value
     return dxl_to_torque(load, model)
 
+
 def dxl_to_ms(value,model):
-    time_factor = 1
-    if model.startswith('XM'):
-        time_factor = 20
-    return time_factor*value
+    return _resolve(model).time_factor*value
+
+
 def ms_to_dxl(value,model):
-    time_factor = 1
-    if model.startswith('XM'):
-        time_factor = 20
-    return value//time_factor
+    return int(value // _resolve(model).time_factor)
+
 # MARK - Acceleration
 
 
@@ -211,7 +188,7 @@ def acceleration_to_dxl(value, model):
 
 
 def dxl_to_pid(value, model):
-    if(model.startswith('XM')):
+    if _resolve(model).family == 'XM':
         return (value[2],value[1],value[0])
     else:
         return (value[0] * 0.004,
@@ -220,27 +197,77 @@ def dxl_to_pid(value, model):
 
 
 def pid_to_dxl(value, model):
-    if(model.startswith('XM')):
+    if _resolve(model).family == 'XM':
         return (value[2],value[1],value[0])
     else:
-        def truncate(x):
-            return int(max(0, min(x, 254)))
-        return [truncate(x * y) for x, y in zip(value, (250, 2.048, 8.0))]
+        p, i, d = value
+        return [int(max(0, min(p * 250, 254))),
+                int(max(0, min(i * 2.048, 254))),
+                int(max(0, min(d * 8.0, 254)))]
 
 def dxl_to_pi(value, model):
-    if(model.startswith('XM')):
+    if _resolve(model).family == 'XM':
         return (value[1],value[0])
     else:
         return (value[0] * 0.004,
             value[1] * 0.48828125)
 
 def pi_to_dxl(value, model):
-    if(model.startswith('XM')):
+    if _resolve(model).family == 'XM':
         return (value[1],value[0])
     else:
         return (value[0] * 0.004,
             value[1] * 0.48828125)
 
+# MARK: - Batch conversions
+
+
+class ConverterBatch(object):
+    """ Applies the position/speed/load conversions to all the motors of a bus at once.
+
+        The conversion parameters are stored as arrays (one slot per motor, in the order of the given models)
+        so a whole sync read/write reply is converted with a few vectorized operations instead of a python loop.
+
+        """
+    def __init__(self, models):
+        self.models = tuple(models)
+
+        params = [_resolve(m) for m in self.models]
+        self._pos_scale = numpy.array([p.position_factor for p in params], dtype=numpy.float64)
+        self._pos_hi = numpy.array([p.max_pos - 1 for p in params], dtype=numpy.float64)
+        self._speed_scale = numpy.array([p.speed_factor for p in params], dtype=numpy.float64)
+        self._torque_scale = numpy.array([p.torque_factor for p in params], dtype=numpy.float64)
+
+    def decode_positions(self, raw):
+        raw_signed = numpy.asarray(raw, dtype=numpy.uint32).view(numpy.int32)
+        return raw_signed * self._pos_scale
+
+    def encode_positions(self, degrees):
+        pos = numpy.divide(degrees, self._pos_scale, dtype=numpy.float64)
+        if not numpy.isfinite(pos).all():
+            raise ValueError('cannot convert non finite positions {} to dxl'.format(degrees))
+        numpy.rint(pos, out=pos)
+        numpy.clip(pos, 0, self._pos_hi, out=pos)
+        return pos.astype(numpy.int32)
+
+    def decode_speeds(self, raw):
+        raw_signed = numpy.asarray(raw, dtype=numpy.uint32).view(numpy.int32)
+        return raw_signed * self._speed_scale
+
+    def decode_loads(self, raw):
+        raw_signed = numpy.asarray(raw, dtype=numpy.uint16).view(numpy.int16)
+        load = numpy.multiply(raw_signed, self._torque_scale)
+        return numpy.round(load, 1, out=load)
+
+
+# Scalar conversions which have an equivalent method in ConverterBatch
+batch_conversions = {
+    dxl_to_degree: 'decode_positions',
+    degree_to_dxl: 'encode_positions',
+    dxl_to_speed: 'decode_speeds',
+    dxl_to_load: 'decode_loads',
+}
+
 # MARK: - Model
 
 
@@ -262,6 +289,36 @@ dynamixelModels = {
     1020:'XM-430'
 }
 
+def _model_family(model):
+    # the conversion factors are shared within a family ('MX', 'SR', ...)
+    return model[:2] if model[:2] in position_range else '*'
+
+
+# Conversion parameters of a model (position_factor is the dxl to degree scale)
+_ModelParams = namedtuple('_ModelParams', ('family', 'max_pos', 'max_deg', 'position_factor',
+                                           'speed_factor', 'time_factor', 'torque_factor'))
+
+
+def _make_params(model):
+    family = _model_family(model)
+    max_pos, max_deg = position_range[family]
+
+    return _ModelParams(family, max_pos, max_deg, max_deg / max_pos,
+                        _SPEED_FACTOR[family], _TIME_FACTOR[family], _TORQUE_FACTOR[family])
+
+
+# Conversion parameters of each model, unknown models are added on their first lookup
+_REGISTRY = {m: _make_params(m) for m in set(dynamixelModels.values())}
+
+
+def _resolve(model):
+    """ Returns the :class:`_ModelParams` conversion parameters of a model. """
+    try:
+        return _REGISTRY[model]
+    except KeyError:
+        params = _REGISTRY[model] = _make_params(model)
+        return params
+
 
 def dxl_to_model(value, dummy=None):
     return dynamixelModels[value]
@@ -272,32 +329,97 @@ def check_bit(value, offset):
     return bool(value & (1 << offset))
 
 
+_DRIVE_DECODE = (('normal', 'master'),
+                 ('reverse', 'master'),
+                 ('normal', 'slave'),
+                 ('reverse', 'slave'))
+
+
 def dxl_to_drive_mode(value, model):
-    return ('reverse' if check_bit(value, 0) else 'normal',
-            'slave' if check_bit(value, 1) else 'master')
+    return _DRIVE_DECODE[value & 0b11]
+
+
+_DRIVE_ENCODE = {mode: i for i, mode in enumerate(_DRIVE_DECODE)}
 
 
 def drive_mode_to_dxl(value, model):
-    return (int('slave' in value) << 1 | int('reverse' in value))
+    try:
+        return _DRIVE_ENCODE[tuple(value)]
+    except KeyError:
+        # any other form, e.g. ('slave', ) or ('slave', 'reverse')
+        return (int('slave' in value) << 1 | int('reverse' in value))
+
+
+def _unpack_load_velocity_position(load, velocity, position, torque_factor, speed_factor, position_factor):
+    if load >= 0x8000:
+        load -= 0x10000
+    if velocity >= 0x80000000:
+        velocity -= 0x100000000
+    if position >= 0x80000000:
+        position -= 0x100000000
+    return (round(load * torque_factor, 1), velocity * speed_factor, position * position_factor)
+
+
+_unpack_load_velocity_position_jit = None
+
+
+def _unpack_kernel():
+    # numba is optional and slow to import, so it is only loaded (and the kernel jitted) on first use
+    global _unpack_load_velocity_position_jit
+    if _unpack_load_velocity_position_jit is None:
+        try:
+            from numba import njit
+        except ImportError:
+            _unpack_load_velocity_position_jit = _unpack_load_velocity_position
+        else:
+            _unpack_load_velocity_position_jit = njit(cache=True)(_unpack_load_velocity_position)
+    return _unpack_load_velocity_position_jit
+
 
 def dxl_to_load_velocity_position(value,model):
-    load = dxl_to_load(value & 0xffff,model)
-    velocity = dxl_to_speed(((value>>16) & 0xffffffff),model)
-    position = dxl_to_degree(((value>>48) & 0xffffffff),model)
-    return(load,velocity,position)
-# MARK: - Baudrate
+    params = _resolve(model)
+    return _unpack_kernel()(value & 0xffff, (value >> 16) & 0xffffffff, (value >> 48) & 0xffffffff,
+                            params.torque_factor, params.speed_factor, params.position_factor)
+
 
 def dxl_to_load_velocity_multi_position(value,model):
-    load = dxl_to_load(value & 0xffff,model)
-    velocity = dxl_to_speed(((value>>16) & 0xffffffff),model)
-    position = dxl_to_multi_degree(((value>>48) & 0xffffffff),model)
-    return(load,velocity,position)
+    params = _resolve(model)
+    return _unpack_kernel()(value & 0xffff, (value >> 16) & 0xffffffff, (value >> 48) & 0xffffffff,
+                            params.torque_factor, params.speed_factor, 0.088)
+
+
+# Packed layout of a load/velocity/position block (10 bytes, little endian, no padding)
+# The fields are read as signed integers so the two's complement sign extension comes for free
+_lvp_dtype = numpy.dtype([('load', '<i2'), ('vel', '<i4'), ('pos', '<i4')])
+
+
+def decode_lvp_block(buf, model):
+    """ Decodes consecutive packed load/velocity/position blocks (e.g. a sync read reply) in one pass.
+
+        This is the batch version of :func:`dxl_to_load_velocity_position`.
+
+        :param buf: raw bytes, 10 bytes per motor
+        :returns: (N, 3) float array of (load, velocity, position)
+
+        """
+    params = _resolve(model)
+    arr = numpy.frombuffer(buf, dtype=_lvp_dtype)
+
+    # each column is computed in place, without intermediate arrays
+    out = numpy.empty((len(arr), 3))
+    numpy.multiply(arr['load'], params.torque_factor, out=out[:, 0])
+    numpy.round(out[:, 0], 1, out=out[:, 0])
+    numpy.multiply(arr['vel'], params.speed_factor, out=out[:, 1])
+    numpy.multiply(arr['pos'], params.position_factor, out=out[:, 2])
+    return out
+
 
+# MARK: - Baudrate
 
 dynamixelBaudrates = {
     1: 1000000.0,
     3: 500000.0,
-    4: 400000.0,-
+    4: 400000.0,
     16: 117647.1,
     34: 57600.0,
     103: 19230.8,
@@ -321,12 +443,28 @@ def dxl_to_baudrate(value, model):
     return dynamixelBaudratesWithModel.get(model, dynamixelBaudrates)[value]
 
 
+def _baudrate_lookup(baudrates):
+    # (exact baudrate -> dxl value, (dxl value, baudrate) pairs) used to invert a baudrate table
+    return ({round(v): k for k, v in baudrates.items()},
+            tuple(baudrates.items()))
+
+
+_BAUDRATE_LOOKUP = {model: _baudrate_lookup(baudrates)
+                    for model, baudrates in dynamixelBaudratesWithModel.items()}
+_DEFAULT_BAUDRATE_LOOKUP = _baudrate_lookup(dynamixelBaudrates)
+
+
 def baudrate_to_dxl(value, model):
-    current_baudrates = dynamixelBaudratesWithModel.get(model, dynamixelBaudrates)
-    for k, v in current_baudrates.items():
+    exact, items = _BAUDRATE_LOOKUP.get(model, _DEFAULT_BAUDRATE_LOOKUP)
+
+    k = exact.get(round(value))
+    if k is not None:
+        return k
+
+    for k, v in items:
         if (abs(v - value) / float(value)) < 0.05:
             return k
-    raise ValueError('incorrect baudrate {} (possible values {})'.format(value, list(current_baudrates.values())))
+    raise ValueError('incorrect baudrate {} (possible values {})'.format(value, [v for _, v in items]))
 
 # MARK: - Return Delay Time
 
@@ -338,12 +476,6 @@ def dxl_to_rdt(value, model):
 def rdt_to_dxl(value, model):
     return int(value / 2)
 
-def ms_to_dxl(value,model):
-    return int(value/20)
-
-def dxl_to_ms(value,model):
-    return value*20
-
 # MARK: - Temperature
 
 
@@ -358,11 +490,12 @@ def temperature_to_dxl(value, model):
 
 
 def dxl_to_current(value, model):
-    if model.startswith('SR'):
+    family = _resolve(model).family
+    if family == 'SR':
         # The SR motors do use a different conversion formula than the dynamixel motors
         # See http://kb.seedrobotics.com/doku.php?id=dh4d:dynamixelcontroltables
         return (value * 0.4889) / 1000.0
-    elif model.startswith('XM'):
+    elif family == 'XM':
         # dunno if this generalizes lol
         conv = 2.69/1000
         # 2 byte 2s complement.
@@ -373,11 +506,12 @@ def dxl_to_current(value, model):
         return 4.5 * (value - 2048.0) / 1000.0
 
 def current_to_dxl(value, model):
-    if model.startswith('SR'):
+    family = _resolve(model).family
+    if family == 'SR':
         # The SR motors do use a different conversion formula than the dynamixel motors
         # See http://kb.seedrobotics.com/doku.php?id=dh4d:dynamixelcontroltables
         return (value / 0.4889) * 1000.0
-    elif model.startswith('XM'):
+    elif family == 'XM':
         # dunno if this generalizes lol
         conv = 2.69/1000
         return int(value / conv)
@@ -428,9 +562,13 @@ def dxl_to_alarm(value, model):
     return decode_error(value)
 
 
+# Decoded errors for each of the 256 possible error codes (the MSB corresponds to the first error)
+_ERROR_TABLE = tuple(tuple(e for i, e in enumerate(dynamixelErrors) if code & (0x80 >> i))
+                     for code in range(256))
+
+
 def decode_error(error_code):
-    bits = numpy.unpackbits(numpy.asarray(error_code, dtype=numpy.uint8))
-    return tuple(numpy.array(dynamixelErrors)[bits == 1])
+    return _ERROR_TABLE[error_code & 0xFF]
 
 
 def alarm_to_dxl(value, model):
@@ -486,49 +624,53 @@ def bool_to_dxl(value, model):
 def dxl_decode(data):
     if len(data) == 0:
         raise ValueError('try to decode incorrect data {}'.format(data))
-    
-    # if len(data) == 1:
-    #     return data[0]
-
-    # if len(data) == 2:
-    #     return data[0] + (data[1] << 8)
-    
-    # if len(data) == 4:
-    #     return data[0] + (data[1]<<8) + (data[])
-    output = 0
-    # print('\n\nthis is data {}\n\n'.format(data))
-    for i in range(len(data)):
-        output += (data[i] << (8*i))
-        # print('this is output now',output)
-    return output
+
+    return int.from_bytes(bytes(data), 'little')
+
 
 def dxl_decode_all(data, nb_elem):
     if nb_elem > 1:
-        data = list(zip(*([iter(data)] * (len(data) // nb_elem))))
-        return tuple(map(dxl_decode, data))
+        data = memoryview(bytes(data))
+        length = len(data) // nb_elem
+        return tuple(int.from_bytes(data[i:i + length], 'little')
+                     for i in range(0, length * nb_elem, length or 1))
     else:
         return dxl_decode(data)
 
 
 def dxl_code(value, length):
-    start_time = time.time()
     if length <= 0:
         raise ValueError('try to code value with an incorrect length {}'.format(length))
 
-    # if length == 1:
-    #     return (value, )
+    # values are truncated to length bytes (two's complement for negative values),
+    # operator.index rejects non integer values (e.g. floats) instead of silently truncating them
+    value = operator.index(value) & ((1 << (8 * length)) - 1)
+    return value.to_bytes(length, 'little')
+
+
+# Little endian dtypes used to code several values at once
+_CODE_DTYPES = {1: '<u1', 2: '<u2', 4: '<u4'}
 
-    # if length == 2:
-    #     return (value % 256, value >> 8)
-    result = length*[0]
-    # print(value)
-    for i in range(length):
-        result[i]  = ((value >> (8*i)) & 0xff)
-    # print('decoding took {}'.format(time.time()-start_time))
-    return tuple(result)
 
 def dxl_code_all(value, length, nb_elem):
+    """ Codes a register value (or its nb_elem values) as little endian bytes.
+
+        :raises TypeError: if a value is not an integer
+
+        """
     if nb_elem > 1:
-        return list(itertools.chain(*(dxl_code(v, length) for v in value)))
+        dtype = _CODE_DTYPES.get(length)
+        values = numpy.asarray(value)
+        if dtype is not None and values.dtype.kind in 'iub':
+            # the cast to the unsigned dtype truncates the values as dxl_code does
+            return values.astype(dtype).tobytes()
+        return b''.join(dxl_code(v, length) for v in value)
     else:
         return dxl_code(value, length)
+
+
+# Use the compiled byte packers when the _conversion_fast extension has been built (requires Cython)
+try:
+    from ._conversion_fast import dxl_decode, dxl_code  # noqa: F811
+except ImportError:
+    pass
@@ -9,7 +9,7 @@ from collections import namedtuple, OrderedDict
 from contextlib import contextmanager
 
 from ..conversion import (dxl_code_all, dxl_decode_all, decode_error,
-                          dxl_to_model)
+                          dxl_to_model, batch_conversions, ConverterBatch)
 
 
 logger = logging.getLogger(__name__)
@@ -18,6 +18,9 @@ logger = logging.getLogger(__name__)
 # - the baudrate
 # - the timeout
 
+# Below this number of motors the per-call numpy overhead outweighs the vectorized conversions
+_BATCH_CONVERSION_MIN_MOTORS = 8
+
 
 _DxlControl = namedtuple('_DxlControl', ('name',
                                          'address', 'length', 'nb_elem',
@@ -64,6 +67,7 @@ class AbstractDxlIO(object):
             """
         self._known_models = {}
         self._known_mode = {}
+        self._converter_batches = {}
 
         self._sync_read = use_sync_read
         self._error_handler = error_handler_cls() if error_handler_cls else None
@@ -111,6 +115,7 @@ class AbstractDxlIO(object):
         for i in range(max_recursion):
             self._known_models.clear()
             self._known_mode.clear()
+            self._converter_batches.clear()
 
             with self._serial_lock:
                 self.close(_force_lock=True)
@@ -454,7 +459,7 @@ class AbstractDxlIO(object):
             models = self.get_model(ids)
             if not models:
                 return ()
-            values = [control.dxl_to_si(v, m) for v, m in zip(values, models)]
+            values = self._convert_all(control.dxl_to_si, values, models)
 
         return tuple(values)
 
@@ -470,7 +475,7 @@ class AbstractDxlIO(object):
                 return
 
             value_for_id = dict(zip(value_for_id.keys(),
-                                    map(control.si_to_dxl, value_for_id.values(), models)))
+                                    self._convert_all(control.si_to_dxl, value_for_id.values(), models)))
 
         data = []
         for motor_id, value in value_for_id.items():
@@ -480,6 +485,17 @@ class AbstractDxlIO(object):
         wp = self._protocol.DxlSyncWritePacket(control.address, control.length * control.nb_elem, data)
         self._send_packet(wp, wait_for_status_packet=False)
 
+    def _convert_all(self, conversion, values, models):
+        # Conversions with a vectorized equivalent are applied to all motors at once
+        method = batch_conversions.get(conversion)
+        if method is not None and len(models) >= _BATCH_CONVERSION_MIN_MOTORS:
+            batch = self._converter_batches.get(models)
+            if batch is None:
+                batch = self._converter_batches[models] = ConverterBatch(models)
+            return getattr(batch, method)(list(values)).tolist()
+
+        return [conversion(v, m) for v, m in zip(values, models)]
+
     # MARK: - Send/Receive packet
     def __real_send(self, instruction_packet, wait_for_status_packet, _force_lock):
         if self.closed:
@@ -5,7 +5,7 @@ import re
 import os
 import sys
 
-from setuptools import setup, find_packages
+from setuptools import setup, find_packages, Extension
 
 
 def version():
@@ -23,6 +23,19 @@ install_requires = ['numpy',
                     'wget',
                     ]
 
+# Optional compiled version of the dynamixel byte packers, the pure python ones are used otherwise.
+# Cython is not a build requirement: it has to be installed beforehand for the extension to be built
+# and a failing compilation does not abort the installation.
+try:
+    from Cython.Build import cythonize
+    # the compiler directives are set in the header of the .pyx
+    ext_modules = cythonize([Extension('pypot.dynamixel._conversion_fast',
+                                       ['pypot/dynamixel/_conversion_fast.pyx'])])
+    for ext in ext_modules:
+        ext.optional = True  # not carried over by cythonize
+except ImportError:
+    ext_modules = []
+
 if sys.version_info < (3, 5):
     print("python version < 3.5 is not supported")
     sys.exit(1)
@@ -41,10 +54,12 @@ setup(name='pypot',
       packages=find_packages(),
 
       install_requires=install_requires,
+      ext_modules=ext_modules,
 
       extras_require={
           'doc': ['sphinx', 'sphinxjp.themes.basicstrap', 'sphinx-bootstrap-theme'],
           'zmq-server': ['zmq'],
+          'numba': ['numba'],
           'remote-robot': ['zerorpc'],
           'camera': ['hampy', 'zmq'],  # Extras require: opencv (not a PyPi packet)
           'tests': ['requests', 'websocket-client', 'poppy-ergo-jr'],